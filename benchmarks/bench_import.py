@@ -0,0 +1,63 @@
+# 冷启动基准测试
+# 在新的解释器中用 python -X importtime 导入 app，统计导入耗时（取多次的中位数）和耗时最多的模块，
+# 并测量导入后第一个请求（触发建表、默认数据和模板预编译）的耗时。
+# 导入耗时超过 --budget-ms 时以非零状态退出，可以放在 CI 中防止启动变慢
+# 用法: python benchmarks/bench_import.py --repeat 5 --budget-ms 400
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = '''
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/')
+print(imported - start, time.perf_counter() - imported)
+'''
+
+def import_times(env):
+    # 返回 {模块: (自身耗时, 累计耗时)}，单位微秒
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True, cwd=ROOT, env=env).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='导入 app 与第一个请求的耗时')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=None, help='导入耗时上限（毫秒）')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    runs = [import_times(env) for _ in range(args.repeat)]
+    totals = [run['app'][1] / 1000 for run in runs]
+    median = statistics.median(totals)
+    print(f'导入 app：中位数 {median:.1f} 毫秒（{", ".join(f"{t:.1f}" for t in totals)}）')
+    print(f'自身耗时最多的 {args.top} 个模块：')
+    last = runs[-1]
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f'  {name:<50}{self_us / 1000:>8.1f} 毫秒')
+
+    output = subprocess.run([sys.executable, '-c', FIRST_REQUEST], capture_output=True, text=True,
+                            check=True, cwd=ROOT, env=env).stdout
+    imported, first_request = (float(value) * 1000 for value in output.split())
+    print(f'导入 {imported:.1f} 毫秒，第一个请求 {first_request:.1f} 毫秒')
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f'导入耗时 {median:.1f} 毫秒超过上限 {args.budget_ms:.0f} 毫秒', file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# 登录吞吐量基准测试
+# 对每种哈希强度，在临时数据库中创建 --users 个用户，用 --clients 个线程并发登录，
+# 同时用一个线程持续请求首页，输出每秒登录次数和登录高峰期间首页的延迟（检查哈希计算是否挤占其他请求）。
+# 默认关闭登录校验缓存，测量每次都计算哈希的情况；--cache 打开缓存
+# 用法: python benchmarks/bench_login.py --clients 8 --duration 5 --method pbkdf2:sha256:600000 --method scrypt:32768:8:1
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_METHODS = ['pbkdf2:sha256:100000', 'pbkdf2:sha256:600000', 'scrypt:16384:8:1', 'scrypt:32768:8:1']
+
+def main():
+    parser = argparse.ArgumentParser(description='不同哈希强度下的登录吞吐量')
+    parser.add_argument('--method', action='append', help='可重复指定，默认比较几种常用强度')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='哈希线程数，默认 CPU 核数')
+    parser.add_argument('--cache', action='store_true', help='打开登录校验缓存')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    sys.path.insert(0, ROOT)
+    import app as library
+    from werkzeug.security import generate_password_hash # type: ignore
+
+    library.app.config['LOGIN_CACHE_TTL'] = 300 if args.cache else 0
+    if args.workers:
+        library.app.config['PASSWORD_HASH_WORKERS'] = args.workers
+    library.initialize()
+    db = library.db
+
+    print(f'{"哈希方式":<24}{"单次哈希(ms)":>14}{"登录/秒":>10}{"首页 p50(ms)":>14}{"首页 p99(ms)":>14}')
+    for method in args.method or DEFAULT_METHODS:
+        start = time.perf_counter()
+        password_hash = generate_password_hash('password', method)
+        hash_ms = (time.perf_counter() - start) * 1000
+        library.app.config['PASSWORD_HASH_METHOD'] = method
+        with library.app.app_context():
+            db.session.execute(db.delete(library.User).where(library.User.username.like('bench%')))
+            # 用户共用同一个哈希值会让缓存全部命中，打开缓存时每个用户单独计算
+            db.session.execute(db.insert(library.User), [
+                {'username': f'bench{i}', 'password': generate_password_hash('password', method) if args.cache
+                 else password_hash, 'role': 'user'} for i in range(args.users)
+            ])
+            db.session.commit()
+
+        logins = [0]
+        page_latencies = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.duration
+
+        def login_client(index):
+            client = library.app.test_client()
+            count = 0
+            while time.perf_counter() < deadline:
+                response = client.post('/login?role=user', data={
+                    'username': f'bench{(index + count * args.clients) % args.users}', 'password': 'password'})
+                count += 1
+                if response.status_code == 302:
+                    with lock:
+                        logins[0] += 1
+
+        def page_client():
+            client = library.app.test_client()
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                client.get('/')
+                page_latencies.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=login_client, args=(i,)) for i in range(args.clients)]
+        threads.append(threading.Thread(target=page_client))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        page_latencies.sort()
+        p99 = page_latencies[min(len(page_latencies) - 1, int(len(page_latencies) * 0.99))]
+        print(f'{method:<24}{hash_ms:>14.1f}{logins[0] / args.duration:>10.1f}'
+              f'{statistics.median(page_latencies) * 1000:>14.1f}{p99 * 1000:>14.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# 服务方式吞吐量基准测试
+# 在临时数据库中写入测试数据，分别用 Flask 开发服务器（app.run，每个请求一个线程）和
+# serve.py（多进程 + 线程池）启动应用，以多个并发 HTTP 客户端（保持长连接）压测
+# GET /dashboard 和 POST /search_books，输出每秒请求数和延迟分位数。
+# 用法: python benchmarks/bench_serving.py --clients 16 --duration 10 --workers 4 --threads 8
+#
+# 参考结果（1 核虚拟机，2000 本图书、20000 条借阅记录，8 个客户端，各 5 秒，serve.py 2 个进程各 8 个线程）：
+#   服务方式    路由             请求/秒   p50(ms)   p99(ms)
+#   dev         dashboard           14.4     531.9     841.1
+#   dev         search_books        16.0     542.8     624.2
+#   serve       dashboard           16.0     531.7     744.3
+#   serve       search_books        15.2     538.1     932.2
+# 单核上多进程无法并行，两者吞吐量相当；多核机器上 serve.py 的吞吐量随 --workers 增加
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(database_url, books, records):
+    code = f'''
+import app as library
+library.initialize()
+db = library.db
+with library.app.app_context():
+    db.session.execute(db.insert(library.Book), [
+        {{'title': f'图书{{i}}', 'author': f'作者{{i % 500}}', 'category': f'类别{{i % 20}}',
+          'isbn': f'BENCH{{i:08d}}', 'stock': 1000000}} for i in range({books})])
+    first_book = db.session.execute(db.select(db.func.min(library.Book.id))).scalar()
+    db.session.execute(db.insert(library.BorrowRecord), [
+        {{'user_id': 1, 'book_id': first_book + i % {books}}} for i in range({records})])
+    db.session.commit()
+'''
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT, env=dict(os.environ, DATABASE_URL=database_url))
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务器未在 {timeout} 秒内启动')
+
+def login(port, username='admin', password='admin', role='admin'):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    body = urllib.parse.urlencode({'username': username, 'password': password})
+    connection.request('POST', f'/login?role={role}', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    return response.getheader('Set-Cookie').split(';')[0]
+
+def http_load(port, make_request, clients, duration, cookie):
+    # make_request(rng_index) 返回 (方法, 路径, 表单或 None)；返回每秒请求数、延迟列表（秒）和失败数
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        count = index
+        while time.perf_counter() < deadline:
+            method, path, form = make_request(count)
+            count += clients
+            headers = {'Cookie': cookie}
+            body = None
+            if form is not None:
+                body = urllib.parse.urlencode(form)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                failed = True
+            if failed:
+                with lock:
+                    errors[0] += 1
+            else:
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / duration, latencies, errors[0]
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+ROUTES = {
+    'dashboard': lambda i: ('GET', '/dashboard', None),
+    'search_books': lambda i: ('POST', '/search_books', {'search_query': f'图书{i % 2000}', 'category': ''}),
+}
+
+def server_command(mode, port, args):
+    if mode == 'dev':
+        return [sys.executable, '-c', f'import app; app.app.run(port={port}, threaded=True)']
+    return [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(args.workers), '--threads', str(args.threads)]
+
+def main():
+    parser = argparse.ArgumentParser(description='开发服务器与 serve.py 吞吐量对比')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    seed(database_url, args.books, args.records)
+    env = dict(os.environ, DATABASE_URL=database_url)
+    print(f'{"服务方式":<12}{"路由":<16}{"请求/秒":>10}{"p50(ms)":>10}{"p99(ms)":>10}{"失败":>6}')
+    for mode in ('dev', 'serve'):
+        server = subprocess.Popen(server_command(mode, args.port, args), cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(args.port)
+            cookie = login(args.port)
+            for route, make_request in ROUTES.items():
+                rate, latencies, errors = http_load(args.port, make_request, args.clients, args.duration, cookie)
+                print(f'{mode:<12}{route:<16}{rate:>10.1f}{percentile(latencies, 0.5) * 1000:>10.1f}'
+                      f'{percentile(latencies, 0.99) * 1000:>10.1f}{errors:>6}')
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
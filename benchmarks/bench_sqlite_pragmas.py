@@ -0,0 +1,96 @@
+# SQLite PRAGMA 基准测试
+# 分别在 SQLite 默认设置（回滚日志 + synchronous=FULL）与 app.config['SQLITE_PRAGMAS']
+# 下，用多个线程混合请求 /dashboard 与 /borrow_book，比较读写吞吐量和失败请求数
+# 用法: python benchmarks/bench_sqlite_pragmas.py --threads 8 --duration 10
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+def seed(library, books, records):
+    db = library.db
+    db.session.execute(db.insert(library.Book), [
+        {'title': f'图书{i}', 'author': f'作者{i % 500}', 'category': f'类别{i % 20}',
+         'isbn': f'BENCH{i:08d}', 'stock': 1000000}
+        for i in range(books)
+    ])
+    admin = library.User.query.filter_by(username='admin').first()
+    first_book = db.session.execute(db.select(db.func.min(library.Book.id))).scalar()
+    db.session.execute(db.insert(library.BorrowRecord), [
+        {'user_id': admin.id, 'book_id': first_book + i % books} for i in range(records)
+    ])
+    db.session.commit()
+    return first_book
+
+def run_child(args):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    sys.path.insert(0, ROOT)
+    import app as library
+
+    # 只测数据库，关闭片段缓存
+    library.fragment_cache.store.max_size = 0
+    with library.app.app_context():
+        if args.mode == 'default':
+            # journal_mode 会写入数据库文件，需要显式切回回滚日志模式
+            library.app.config['SQLITE_PRAGMAS'] = DEFAULT_PRAGMAS
+            library.db.engine.dispose()
+        library.initialize()
+        first_book = seed(library, args.books, args.records)
+
+    counts = {'read': 0, 'write': 0, 'error': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        client = library.app.test_client()
+        client.post('/login?role=admin', data={'username': 'admin', 'password': 'admin'})
+        while time.perf_counter() < deadline:
+            if rng.random() < args.write_ratio:
+                kind = 'write'
+                response = client.get(f'/borrow_book/{first_book + rng.randrange(args.books)}')
+            else:
+                kind = 'read'
+                response = client.get('/dashboard')
+            with lock:
+                counts[kind if response.status_code < 500 else 'error'] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(args.mode, counts['read'] / args.duration, counts['write'] / args.duration, counts['error'])
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite PRAGMA 读写吞吐量对比')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--mode', choices=['default', 'tuned'])
+    args = parser.parse_args()
+    if args.mode:
+        run_child(args)
+        return
+
+    # 每种设置在独立进程和独立数据库文件中运行，互不影响
+    print(f'{"设置":<10}{"读/秒":>12}{"写/秒":>12}{"失败":>8}')
+    for mode in ('default', 'tuned'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode] + sys.argv[1:],
+            capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        name, reads, writes, errors = output.split()[-4:]
+        print(f'{name:<10}{float(reads):>12.1f}{float(writes):>12.1f}{int(errors):>8}')
+
+if __name__ == '__main__':
+    main()
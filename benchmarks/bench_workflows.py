@@ -0,0 +1,234 @@
+# 借还业务流程基准测试
+# 按指定规模生成测试数据库（图书、用户、借阅记录），依次压测 login、dashboard、search_books、
+# borrow_book、return_book、add_book、submit_feedback 七个路由：
+#   client  在本进程内用 Flask 测试客户端逐个请求，只计应用本身的耗时
+#   http    用 serve.py 启动服务，多个并发 HTTP 客户端（保持长连接）压测，包含网络与服务器开销
+# 输出每个路由的吞吐量与 p50/p95/p99 延迟，结果另存为 benchmarks/results/ 下的 JSON 文件；
+# --compare 指定以前的结果文件时逐项对比，p95 变慢超过 --max-regression 时以退出码 1 结束，便于在 CI 中发现性能退化。
+# 数据由 app.generate_data 按随机种子生成，--database 指定的文件已按相同参数生成过时直接复用，大规模数据只需生成一次。
+# 用法: python benchmarks/bench_workflows.py --books 1000000 --records 10000000 --users 100000 \
+#           --database /tmp/library-1m.db --compare benchmarks/results/baseline.json
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+ROUTE_NAMES = ('login', 'dashboard', 'search_books', 'borrow_book', 'return_book', 'add_book', 'submit_feedback')
+SEED_PASSWORD = 'password'
+
+def seed(library, args):
+    # 数据由 synthetic_data.py 生成，见 flask --app app generate-data；读者共用密码 SEED_PASSWORD
+    with library.app.app_context():
+        library.generate_data(args.books, args.users, args.records, args.seed, password=SEED_PASSWORD,
+                              on_chunk=lambda kind, done, rate: print(f'\r{kind} {done}（{rate:.0f} 行/秒）', end='',
+                                                                      file=sys.stderr))
+        print(file=sys.stderr)
+        # 收集统计信息，查询计划与长期运行的大库一致
+        library.db.session.execute(library.db.text('ANALYZE'))
+        library.db.session.commit()
+
+def prepare_database(library, args, path):
+    # 数据库旁的 .seed.json 记录生成参数，参数一致时复用已有数据
+    marker = path + '.seed.json'
+    scale = {'books': args.books, 'records': args.records, 'users': args.users, 'seed': args.seed}
+    if os.path.exists(path) and os.path.exists(marker):
+        with open(marker, encoding='utf-8') as f:
+            if json.load(f) == scale:
+                print(f'复用已生成的数据库 {path}', file=sys.stderr)
+                return
+        raise SystemExit(f'{path} 由其他参数生成，请删除后重试或换一个 --database')
+    start = time.perf_counter()
+    seed(library, args)
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(scale, f)
+    print(f'生成数据用时 {time.perf_counter() - start:.1f} 秒', file=sys.stderr)
+
+def workload(library, args):
+    # 每个路由的请求生成函数 i -> (方法, 路径, 表单或 None)，以及该路由是否需要管理员登录。
+    # 归还从未归还的记录中依次选取，每个请求都走真正的归还路径；
+    # 新增图书的 ISBN 带上本次运行的编号，重复运行不会撞上已有 ISBN
+    import synthetic_data
+    db = library.db
+    rng = random.Random(args.seed + 1)
+    with library.app.app_context():
+        open_records = db.session.execute(
+            db.select(library.BorrowRecord.id).where(library.BorrowRecord.return_date.is_(None))
+            .order_by(library.BorrowRecord.id.desc()).limit(200000)).scalars().all()
+        book_ids = db.session.execute(db.select(library.Book.id).order_by(library.Book.id.desc())
+                                      .limit(200000)).scalars().all()
+        readers = db.session.execute(db.select(library.User.username).where(library.User.username.like('reader%'))
+                                     .limit(200000)).scalars().all()
+    rng.shuffle(open_records)
+    # 检索词取自生成书名用的词表，既有中文也有英文
+    words = synthetic_data.CN_NOUNS + synthetic_data.EN_NOUNS
+    run = f'{int(time.time()) % 100000000:08d}'
+    return {
+        'login': (lambda i: ('POST', '/login?role=user',
+                             {'username': readers[i % len(readers)], 'password': SEED_PASSWORD}), False),
+        'dashboard': (lambda i: ('GET', '/dashboard', None), True),
+        'search_books': (lambda i: ('POST', '/search_books',
+                                    {'search_query': words[rng.randrange(len(words))], 'category': ''}), True),
+        'borrow_book': (lambda i: ('GET', f'/borrow_book/{book_ids[i % len(book_ids)]}', None), True),
+        'return_book': (lambda i: ('GET', f'/return_book/{open_records[i % len(open_records)]}', None), True),
+        'add_book': (lambda i: ('POST', '/add_book', {'title': f'压测图书{i}', 'author': '压测', 'category': '压测',
+                                                      'isbn': f'L{run}{i:09d}', 'stock': '1'}), True),
+        'submit_feedback': (lambda i: ('POST', '/submit_feedback', {'content': f'压测反馈 {i}'}), True),
+    }, open_records
+
+def summarize(latencies, elapsed, errors):
+    from bench_serving import percentile
+    return {'requests': len(latencies), 'errors': errors, 'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.5) * 1000, 'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000}
+
+def run_client(library, routes, args):
+    results = {}
+    for name in args.route:
+        make_request, admin = routes[name]
+        client = library.app.test_client()
+        if admin:
+            client.post('/login?role=admin', data={'username': 'admin', 'password': 'admin'})
+        # 预热请求（模板编译、缓存填充、连接建立）不计入结果
+        for i in range(args.warmup):
+            method, path, form = make_request(i)
+            client.open(path, method=method, data=form)
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        for i in range(args.warmup, args.warmup + args.requests):
+            method, path, form = make_request(i)
+            start = time.perf_counter()
+            response = client.open(path, method=method, data=form)
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+        results[name] = summarize(latencies, time.perf_counter() - started, errors)
+    return results
+
+def run_http(routes, args, database_url, offset):
+    from bench_serving import http_load, login, wait_for_port
+    env = dict(os.environ, DATABASE_URL=database_url)
+    server = subprocess.Popen([sys.executable, 'serve.py', '--bind', f'127.0.0.1:{args.port}', '--workers',
+                               str(args.workers), '--threads', str(args.threads)],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    results = {}
+    try:
+        wait_for_port(args.port)
+        cookie = login(args.port)
+        for name in args.route:
+            make_request, admin = routes[name]
+            # 登录请求不带管理员的会话：换用户登录会注销原会话，影响其他客户端；
+            # 测试客户端阶段已用掉的记录与 ISBN 跳过
+            rate, latencies, errors = http_load(args.port, lambda i: make_request(i + offset), args.clients,
+                                                args.duration, cookie if admin else '')
+            results[name] = summarize(latencies, args.duration, errors)
+            results[name]['throughput'] = rate
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline):
+    print(f'{"方式":<8}{"路由":<18}{"请求/秒":>10}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"失败":>6}{"p95 变化":>10}')
+    regressions = []
+    for mode, routes in results.items():
+        for name, stats in routes.items():
+            change = ''
+            previous = baseline.get(mode, {}).get(name) if baseline else None
+            if previous and previous['p95_ms']:
+                ratio = stats['p95_ms'] / previous['p95_ms'] - 1
+                change = f'{ratio * 100:+.1f}%'
+                regressions.append((mode, name, ratio))
+            print(f'{mode:<8}{name:<18}{stats["throughput"]:>10.1f}{stats["p50_ms"]:>10.1f}{stats["p95_ms"]:>10.1f}'
+                  f'{stats["p99_ms"]:>10.1f}{stats["errors"]:>6}{change:>10}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='图书借还流程的延迟与吞吐量基准测试')
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，相同种子生成相同的数据')
+    parser.add_argument('--database', help='数据库文件，默认每次在临时目录中新建')
+    parser.add_argument('--mode', choices=('client', 'http', 'both'), default='both')
+    parser.add_argument('--route', action='append', choices=ROUTE_NAMES, help='可重复指定，默认全部路由')
+    parser.add_argument('--requests', type=int, default=200, help='测试客户端阶段每个路由的请求数')
+    parser.add_argument('--warmup', type=int, default=10, help='测试客户端阶段每个路由不计入结果的预热请求数')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='HTTP 阶段每个路由的压测秒数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='结果文件，默认 benchmarks/results/<时间>.json')
+    parser.add_argument('--compare', help='与以前的结果文件对比')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='p95 允许变慢的百分比')
+    args = parser.parse_args()
+    args.route = args.route or list(ROUTE_NAMES)
+
+    path = os.path.abspath(args.database) if args.database else os.path.join(tempfile.mkdtemp(), 'bench.db')
+    database_url = 'sqlite:///' + path
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+    import app as library
+    library.initialize()
+    prepare_database(library, args, path)
+    routes, open_records = workload(library, args)
+
+    results = {}
+    if args.mode in ('client', 'both'):
+        results['client'] = run_client(library, routes, args)
+    if args.mode in ('http', 'both'):
+        # 所有借阅与连接在启动服务进程前释放，避免与服务进程争用数据库文件
+        with library.app.app_context():
+            library.db.engine.dispose()
+        results['http'] = run_http(routes, args, database_url, args.warmup + args.requests if args.mode == 'both' else 0)
+    if len(open_records) < args.warmup + args.requests:
+        print(f'注意：未归还的记录只有 {len(open_records)} 条，部分归还请求重复归还同一条记录', file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    regressions = print_results(results, baseline)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scale': {'books': args.books, 'records': args.records, 'users': args.users, 'seed': args.seed},
+        'settings': {'requests': args.requests, 'clients': args.clients, 'duration': args.duration,
+                     'workers': args.workers, 'threads': args.threads},
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'结果已保存到 {output}')
+
+    slower = [(mode, name, ratio) for mode, name, ratio in regressions if ratio * 100 > args.max_regression]
+    for mode, name, ratio in slower:
+        print(f'性能退化：{mode} {name} p95 变慢 {ratio * 100:.1f}%', file=sys.stderr)
+    if slower:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# 页面与片段缓存
+# 每类片段有一个版本号，数据变化时递增版本号，旧版本的缓存不再命中，
+# 随后被 LRU 淘汰；缓存总大小按字符数限制，避免内存无限增长。
+# 版本号保存在外部共享存储中，由 set_versions 同步到本进程，多个进程各自的缓存随任一进程的写入一起失效；
+# 缓存项另有过期时间，不经过版本号的写入（其他客户端直接改库）最多在 ttl 秒后可见
+import threading
+import hashlib
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        if size > self.max_size:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+class FragmentCache:
+    def __init__(self, max_size):
+        self.store = LRUCache(max_size)
+        self.versions = {}
+        self.bumped_at = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, name):
+        return self.versions.get(name, 0)
+
+    def set_versions(self, versions):
+        # versions 为 名称 -> (版本号, 递增时间)，取自共享存储
+        for name, (version, bumped_at) in versions.items():
+            self.versions[name] = version
+            self.bumped_at[name] = bumped_at
+
+    def clear(self):
+        self.store.clear()
+
+    def page(self, name, key, render, store=True, ttl=None):
+        # 返回 (内容, ETag)，ETag 取内容摘要，未命中时才调用 render 生成内容；
+        # store 为 False 时生成的内容不写入缓存，ttl 为缓存的秒数（None 表示不过期）
+        cache_key = (name, self.version(name), key)
+        cached = self.store.get(cache_key)
+        if cached is not None and (cached[1] is None or cached[1] > time.time()):
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        body = render()
+        entry = (body, hashlib.md5(body.encode('utf-8')).hexdigest())
+        if store:
+            self.store.set(cache_key, (entry, time.time() + ttl if ttl else None), len(body))
+        return entry
+
+    def fragment(self, name, key, render, store=True, ttl=None):
+        return self.page(name, key, render, store, ttl)[0]
@@ -0,0 +1,33 @@
+# 逾期罚款计算
+# 对一整块借阅记录做向量化计算：逾期天数 = 向上取整((归还时间或当前时间 - 到期时间) / 1天) - 宽限天数，
+# 罚款 = min(逾期天数 × 日罚金, 上限)。日罚金、宽限天数和上限可以按图书类别单独设置
+import numpy as np # type: ignore
+
+SECONDS_PER_DAY = 86400
+
+def tariff_table(tariff):
+    # 返回 (有单独规则的类别, 规则表)。规则表每行为 (日罚金, 宽限天数, 上限)，
+    # 第 0 行是默认标准，第 i 行对应第 i 个类别（从 1 开始），借阅记录用行号表示适用的规则
+    names = list(tariff.get('categories', {}))
+    rows = []
+    for rule in [{}] + [tariff['categories'][name] for name in names]:
+        cap = rule.get('max_fine', tariff['max_fine'])
+        rows.append((rule.get('daily_rate', tariff['daily_rate']),
+                     rule.get('grace_days', tariff['grace_days']),
+                     np.inf if cap is None else cap))
+    return names, np.array(rows, dtype=np.float64)
+
+def category_codes(categories, names):
+    # 类别名称转换为规则行号，没有单独规则的类别使用第 0 行
+    index = {name: i + 1 for i, name in enumerate(names)}
+    return np.fromiter((index.get(category, 0) for category in categories), dtype=np.intp, count=len(categories))
+
+def compute_fines(due, returned, now, codes, table):
+    # due/returned 为 Unix 时间戳数组，未归还的记录 returned 为 NaN，按 now 计算
+    due = np.asarray(due, dtype=np.float64)
+    end = np.asarray(returned, dtype=np.float64)
+    end = np.where(np.isnan(end), now, end)
+    days_late = np.ceil((end - due) / SECONDS_PER_DAY)
+    rates, graces, caps = table[np.asarray(codes, dtype=np.intp)].T
+    chargeable = np.clip(days_late - graces, 0, None)
+    return np.round(np.minimum(chargeable * rates, caps), 2)
@@ -0,0 +1,182 @@
+# 请求级性能统计
+# 打开后记录每个请求的耗时、SQL 语句条数与耗时、模板渲染耗时和读写的行数，
+# 按路由汇总为 Prometheus 文本格式的指标；超过阈值的慢请求连同执行过的 SQL 写入日志。
+# SQL 与模板的事件监听只在打开时注册，关闭时每个请求只多一次配置判断
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import template_rendered, before_render_template # type: ignore
+from sqlalchemy import event # type: ignore
+
+logger = logging.getLogger('library.slow')
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 慢请求日志中每个请求最多保留的 SQL 条数
+MAX_CAPTURED_STATEMENTS = 50
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+class RequestStats:
+    def __init__(self, endpoint, method, path):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.status = 500
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.template_seconds = 0.0
+        self.statements = []
+        self.templates = []
+
+class Instrumentation:
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.installed = False
+        self.requests = defaultdict(int)
+        self.durations = defaultdict(lambda: [0] * (len(BUCKETS) + 1) + [0.0])
+        self.sql = defaultdict(lambda: [0, 0.0])
+        self.rows = defaultdict(int)
+        self.templates = defaultdict(lambda: [0, 0.0])
+        # 其他模块的指标（定时任务、缓存），返回 (名称, 类型, 说明, [(标签, 值)])
+        self.collectors = []
+
+    def install(self, engines, db_session):
+        # 注册 SQL、ORM 加载和模板渲染的事件监听，只执行一次
+        if self.installed:
+            return
+        self.installed = True
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(db_session, 'loaded_as_persistent', self.loaded)
+        before_render_template.connect(self.before_render, weak=False)
+        template_rendered.connect(self.after_render, weak=False)
+
+    @property
+    def current(self):
+        return getattr(self.local, 'stats', None)
+
+    def start(self, endpoint, method, path):
+        self.local.stats = RequestStats(endpoint, method, path)
+
+    def finish(self, slow_threshold):
+        stats = self.current
+        if stats is None:
+            return
+        self.local.stats = None
+        duration = time.perf_counter() - stats.started
+        endpoint = stats.endpoint or 'unknown'
+        with self.lock:
+            self.requests[(endpoint, stats.method, stats.status)] += 1
+            histogram = self.durations[endpoint]
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(BUCKETS)] += 1
+            histogram[-1] += duration
+            self.sql[endpoint][0] += stats.sql_count
+            self.sql[endpoint][1] += stats.sql_seconds
+            self.rows[endpoint] += stats.rows
+            for name, seconds in stats.templates:
+                self.templates[name][0] += 1
+                self.templates[name][1] += seconds
+        if duration >= slow_threshold:
+            self.log_slow(stats, duration)
+
+    def log_slow(self, stats, duration):
+        lines = [f'慢请求 {stats.method} {stats.path} {stats.status} {duration * 1000:.1f}ms，'
+                 f'SQL {stats.sql_count} 条 {stats.sql_seconds * 1000:.1f}ms，'
+                 f'模板 {stats.template_seconds * 1000:.1f}ms，{stats.rows} 行']
+        for statement, seconds in stats.statements:
+            lines.append(f'  {seconds * 1000:8.2f}ms  {" ".join(statement.split())}')
+        if stats.sql_count > len(stats.statements):
+            lines.append(f'  ……另有 {stats.sql_count - len(stats.statements)} 条')
+        logger.warning('\n'.join(lines))
+
+    def before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if self.current is not None:
+            connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        stats = self.current
+        if stats is None or not connection.info.get('query_started'):
+            return
+        seconds = time.perf_counter() - connection.info['query_started'].pop()
+        stats.sql_count += 1
+        stats.sql_seconds += seconds
+        # 写语句按影响的行数计，查询的行数由 ORM 加载对象时累计
+        if cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+        if len(stats.statements) < MAX_CAPTURED_STATEMENTS:
+            stats.statements.append((statement, seconds))
+
+    def loaded(self, session, instance):
+        stats = self.current
+        if stats is not None:
+            stats.rows += 1
+
+    def before_render(self, sender, template, context, **extra):
+        stats = self.current
+        if stats is not None:
+            self.local.render_started = time.perf_counter()
+
+    def after_render(self, sender, template, context, **extra):
+        stats = self.current
+        started = getattr(self.local, 'render_started', None)
+        if stats is None or started is None:
+            return
+        self.local.render_started = None
+        seconds = time.perf_counter() - started
+        stats.template_seconds += seconds
+        stats.templates.append((template.name, seconds))
+
+    def render(self):
+        # Prometheus 文本格式
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                out.append(f'{name}{format_labels(labels)} {value}')
+
+        with self.lock:
+            metric('library_requests_total', 'counter', '请求数',
+                   [((('endpoint', e), ('method', m), ('status', s)), n) for (e, m, s), n in sorted(self.requests.items())])
+            out.append('# HELP library_request_duration_seconds 请求耗时')
+            out.append('# TYPE library_request_duration_seconds histogram')
+            for endpoint, histogram in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram):
+                    cumulative += count
+                    out.append(f'library_request_duration_seconds_bucket'
+                               f'{format_labels((("endpoint", endpoint), ("le", bound)))} {cumulative}')
+                out.append(f'library_request_duration_seconds_sum{format_labels((("endpoint", endpoint),))} {histogram[-1]}')
+                out.append(f'library_request_duration_seconds_count{format_labels((("endpoint", endpoint),))} {cumulative}')
+            metric('library_sql_queries_total', 'counter', 'SQL 语句条数',
+                   [((('endpoint', e),), v[0]) for e, v in sorted(self.sql.items())])
+            metric('library_sql_seconds_total', 'counter', 'SQL 执行耗时',
+                   [((('endpoint', e),), v[1]) for e, v in sorted(self.sql.items())])
+            metric('library_db_rows_total', 'counter', 'ORM 加载的对象数与写语句影响的行数',
+                   [((('endpoint', e),), v) for e, v in sorted(self.rows.items())])
+            metric('library_template_renders_total', 'counter', '模板渲染次数',
+                   [((('template', t),), v[0]) for t, v in sorted(self.templates.items())])
+            metric('library_template_seconds_total', 'counter', '模板渲染耗时',
+                   [((('template', t),), v[1]) for t, v in sorted(self.templates.items())])
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                metric(name, kind, help_text, samples)
+        return '\n'.join(out) + '\n'
@@ -0,0 +1,145 @@
+# 数据库结构迁移
+# db.create_all() 只会创建缺失的表，不会修改已有的表或补建索引。
+# 结构变更按版本号顺序登记在 MIGRATIONS 中，已执行的版本记录在 schema_migrations 表，
+# 每个迁移在单独的事务中执行，只做增量变更，可以直接应用到已有的 books.db 上。
+# 迁移中的每一项可以是 SQL 语句，也可以是接收数据库连接的函数
+from datetime import datetime
+from sqlalchemy import inspect, text # type: ignore
+from sqlalchemy.exc import OperationalError # type: ignore
+
+def widen_password_column(connection):
+    # 密码改存哈希，长度超过原来的 100 个字符；SQLite 不限制 VARCHAR 长度，无需修改
+    if connection.dialect.name != 'sqlite':
+        connection.execute(text('ALTER TABLE "user" ALTER COLUMN password TYPE VARCHAR(255)'))
+
+def add_fine_assessed_column(connection):
+    # 新建的数据库由 db.create_all() 直接建出该列
+    if 'fine_assessed_at' not in {column['name'] for column in inspect(connection).get_columns('borrow_record')}:
+        connection.execute(text('ALTER TABLE borrow_record ADD COLUMN fine_assessed_at TIMESTAMP'))
+
+CIRCULATION_STATS_SQL = [
+    'DELETE FROM daily_book_stats',
+    'DELETE FROM daily_category_stats',
+    'DELETE FROM reader_stats',
+    'DELETE FROM circulation_total',
+    '''INSERT INTO daily_book_stats (day, book_id, loans, returns)
+       SELECT day, book_id, SUM(loans), SUM(returns) FROM (
+           SELECT date(borrow_date) AS day, book_id, 1 AS loans, 0 AS returns FROM borrow_record
+           UNION ALL
+           SELECT date(return_date), book_id, 0, 1 FROM borrow_record WHERE return_date IS NOT NULL
+       ) AS events GROUP BY day, book_id''',
+    '''INSERT INTO daily_category_stats (day, category, loans, returns, due_open)
+       SELECT day, category, SUM(loans), SUM(returns), SUM(due_open) FROM (
+           SELECT date(r.borrow_date) AS day, COALESCE(b.category, '') AS category, 1 AS loans, 0 AS returns, 0 AS due_open
+           FROM borrow_record r LEFT JOIN book b ON b.id = r.book_id
+           UNION ALL
+           SELECT date(r.return_date), COALESCE(b.category, ''), 0, 1, 0
+           FROM borrow_record r LEFT JOIN book b ON b.id = r.book_id WHERE r.return_date IS NOT NULL
+           UNION ALL
+           SELECT date(r.due_date), COALESCE(b.category, ''), 0, 0, 1
+           FROM borrow_record r LEFT JOIN book b ON b.id = r.book_id WHERE r.return_date IS NULL
+       ) AS events GROUP BY day, category''',
+    '''INSERT INTO reader_stats (user_id, loans, open_loans)
+       SELECT user_id, COUNT(*), SUM(CASE WHEN return_date IS NULL THEN 1 ELSE 0 END) FROM borrow_record GROUP BY user_id''',
+    '''INSERT INTO circulation_total (name, value)
+       SELECT 'active_borrowers', COUNT(*) FROM reader_stats WHERE open_loans > 0''',
+]
+
+CATEGORY_OPEN_LOANS_SQL = [
+    'DELETE FROM category_open_loans',
+    '''INSERT INTO category_open_loans (category, open_loans)
+       SELECT COALESCE(b.category, ''), COUNT(*) FROM borrow_record r LEFT JOIN book b ON b.id = r.book_id
+       WHERE r.return_date IS NULL GROUP BY COALESCE(b.category, '')''',
+]
+
+def rebuild_circulation_stats(connection):
+    # 按全部借阅记录重新计算借阅统计的汇总表。用于已有数据的首次汇总、直接写入数据库的批量数据，
+    # 以及图书改变类别后校正按类别的统计（增量更新按借还当时的类别计数）
+    for statement in CIRCULATION_STATS_SQL + CATEGORY_OPEN_LOANS_SQL:
+        connection.execute(text(statement))
+
+# 图书全文索引（SQLite FTS5）
+# 书名、作者、类别把每个汉字拆成独立的词后写入索引，分词函数 cjk_segment 注册在应用的每个 SQLite 连接上。
+# 索引由应用在写入图书的同一事务中维护，不使用触发器：触发器里调用的 cjk_segment 在其他客户端
+# （sqlite3 命令行、备份恢复脚本、旧版系统）的连接上不存在，这些客户端写 book 表会直接报错。
+# 其他客户端写入的图书不会进入索引，可用 flask --app app rebuild-search-index 重建
+OLD_BOOK_FTS_OBJECTS = [
+    'DROP TRIGGER IF EXISTS book_fts_ai',
+    'DROP TRIGGER IF EXISTS book_fts_ad',
+    'DROP TRIGGER IF EXISTS book_fts_au',
+    'DROP TABLE IF EXISTS book_fts',
+    'DROP VIEW IF EXISTS book_fts_source',
+]
+
+def rebuild_book_fts(connection):
+    connection.execute(text('DELETE FROM book_fts'))
+    connection.execute(text('''INSERT INTO book_fts (rowid, title, author, category)
+                               SELECT id, cjk_segment(title), cjk_segment(author), cjk_segment(category) FROM book'''))
+
+def create_book_fts(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    # 旧版本的索引以分词视图为外部内容，靠触发器维护，整体换成独立的 FTS5 表
+    for statement in OLD_BOOK_FTS_OBJECTS:
+        connection.execute(text(statement))
+    try:
+        connection.execute(text("CREATE VIRTUAL TABLE book_fts USING fts5(title, author, category, tokenize='unicode61')"))
+    except OperationalError:
+        # 当前 SQLite 未编译 FTS5 扩展，检索退回 LIKE；SQLite 中语句出错不会中止所在的事务
+        return
+    rebuild_book_fts(connection)
+
+MIGRATIONS = [
+    ('0001_pagination_indexes', [
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_borrow_date_id ON borrow_record (borrow_date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_feedback_date_id ON feedback (date, id)',
+    ]),
+    ('0002_foreign_key_indexes', [
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_user_id ON borrow_record (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_book_id ON borrow_record (book_id)',
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_return_date ON borrow_record (return_date)',
+        'CREATE INDEX IF NOT EXISTS ix_feedback_user_id ON feedback (user_id)',
+        # 未归还的借阅只占全部记录的一小部分，部分索引只收录这些记录，按到期日排序便于查找逾期
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_open_due_date ON borrow_record (due_date) WHERE return_date IS NULL',
+    ]),
+    ('0003_password_hash_length', [widen_password_column]),
+    # 汇总表由 db.create_all() 创建，这里按已有的借阅记录补齐统计
+    ('0004_circulation_stats', [rebuild_circulation_stats]),
+    ('0005_book_fts', [create_book_fts]),
+    # 按类别的未还数表由 db.create_all() 创建，按未归还的借阅补齐
+    ('0006_category_open_loans', CATEGORY_OPEN_LOANS_SQL),
+    # 罚款评估只读尚未评估过的逾期归还记录。已有的逾期归还记录在下一次评估时各计算一次
+    ('0007_fine_assessed_at', [
+        add_fine_assessed_column,
+        'CREATE INDEX IF NOT EXISTS ix_borrow_record_fine_pending ON borrow_record (id) '
+        'WHERE fine_assessed_at IS NULL AND return_date > due_date',
+    ]),
+]
+
+def applied_versions(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations (version VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)'))
+    return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+def pending_migrations(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+def upgrade(engine):
+    # 依次执行尚未执行的迁移，返回本次执行的版本号
+    pending = set(pending_migrations(engine))
+    done = []
+    for version, steps in MIGRATIONS:
+        if version not in pending:
+            continue
+        with engine.begin() as connection:
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.execute(text(step))
+            connection.execute(text('INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)'),
+                               {'version': version, 'applied_at': datetime.utcnow()})
+        done.append(version)
+    return done
@@ -0,0 +1,80 @@
+# 密码哈希
+# 密码使用 werkzeug 的 scrypt/pbkdf2 哈希保存，PASSWORD_HASH_METHOD 决定算法和计算强度。
+# 旧数据库中的明文密码在用户下次登录校验通过后改存哈希，强度配置调整后的旧哈希同样在登录时更新。
+# 哈希计算占用大量 CPU，放在固定大小的线程池中执行（hashlib 计算期间释放 GIL），
+# 登录高峰时在线程池外排队，不会占满处理其他请求的线程；排队超时则提示稍后再试。
+# 校验成功后以 HMAC 摘要缓存一段时间，短时间内重复登录不必重新计算哈希
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash # type: ignore
+
+from cache import LRUCache
+
+HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+class PasswordBusy(Exception):
+    pass
+
+class PasswordHasher:
+    def __init__(self, config):
+        # 配置在每次调用时读取，应用启动后修改配置同样生效（线程数除外）
+        self.config = config
+        self.executor = None
+        self.lock = threading.Lock()
+        # serve.py 的主进程初始化时可能已经计算过哈希（新库写入初始账号），fork 出的子进程只继承线程池对象，
+        # 池中的线程并不存在，提交的任务永远不会执行；子进程中丢弃继承来的线程池和锁，首次使用时重新创建
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+        self.cache = LRUCache(config['LOGIN_CACHE_SIZE'])
+        # 进程内的随机密钥，缓存的摘要离开本进程无法用于离线破解
+        self.cache_key = os.urandom(32)
+        self.dummy_hashes = {}
+
+    def reset(self):
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def run(self, func, *args):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.config['PASSWORD_HASH_WORKERS'],
+                                                   thread_name_prefix='password')
+        future = self.executor.submit(func, *args)
+        try:
+            return future.result(timeout=self.config['PASSWORD_HASH_TIMEOUT'])
+        except TimeoutError:
+            future.cancel()
+            raise PasswordBusy()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.config['PASSWORD_HASH_METHOD'])
+
+    def dummy_hash(self):
+        method = self.config['PASSWORD_HASH_METHOD']
+        if method not in self.dummy_hashes:
+            self.dummy_hashes[method] = self.hash(os.urandom(16).hex())
+        return self.dummy_hashes[method]
+
+    def verify(self, stored, password):
+        # 返回 (是否匹配, 是否需要重新哈希)
+        if stored is None:
+            # 用户不存在时同样计算一次哈希，避免通过响应时间判断用户名是否存在
+            self.run(check_password_hash, self.dummy_hash(), password)
+            return False, False
+        if not stored.startswith(HASH_PREFIXES):
+            return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')), True
+        needs_rehash = stored.split('$', 1)[0] != self.config['PASSWORD_HASH_METHOD']
+        # 缓存以哈希值为键，修改密码后哈希值改变，旧的缓存不会再命中
+        digest = hmac.new(self.cache_key, password.encode('utf-8'), hashlib.sha256).digest()
+        cached = self.cache.get(stored)
+        if cached is not None and cached[1] > time.time() and hmac.compare_digest(cached[0], digest):
+            return True, needs_rehash
+        matched = self.run(check_password_hash, stored, password)
+        if matched and self.config['LOGIN_CACHE_TTL']:
+            self.cache.set(stored, (digest, time.time() + self.config['LOGIN_CACHE_TTL']), 1)
+        return matched, needs_rehash
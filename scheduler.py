@@ -0,0 +1,145 @@
+# 后台定时任务
+# 调度线程按各任务的间隔（加随机抖动，避免多个实例同时触发）把到期任务提交到线程池执行，
+# 同一任务上一次尚未结束时不会重复提交。多进程部署时通过 lock 保证同一任务同一时间只在一处执行：
+# lock.acquire(任务名, 过期时间) 返回是否取得执行权，lock.release(任务名, 保持到) 在执行结束后调用，
+# 保持到下一个周期之前，其他实例在此期间不会重复执行。
+# recorder(任务名, 本次结果) 在每次执行或因锁跳过后调用，用于把执行情况保存到各进程都能读取的地方，
+# 本次结果为 {'skipped', 'failed', 'started', 'duration', 'error'}；job.metrics 只统计本进程
+# TaskQueue 用于请求触发的一次性后台任务，请求只提交任务、不等待结果，同一 key 的任务尚未结束时不重复提交；
+# 任务的状态和结果由任务自己保存到各进程都能读取的地方（如 instance/ 下的文件）
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0.1, run_immediately=False, timeout=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        # 超过 timeout 秒仍未释放的锁视为执行实例已崩溃，其他实例可以接管
+        self.timeout = timeout or interval
+        self.next_run = time.time() if run_immediately else self.schedule_next(time.time())
+        self.running = False
+        self.metrics = {'runs': 0, 'failures': 0, 'skipped': 0, 'last_duration': 0.0, 'total_duration': 0.0,
+                        'max_duration': 0.0, 'last_run': None, 'last_error': None}
+
+    def schedule_next(self, now):
+        return now + self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+class Scheduler:
+    def __init__(self, lock=None, tick=1.0, recorder=None):
+        self.jobs = {}
+        self.lock = lock
+        self.recorder = recorder
+        self.tick = tick
+        self.executor = None
+        self.thread = None
+        self.stopping = threading.Event()
+        self.mutex = threading.Lock()
+
+    def add_job(self, name, func, interval, **options):
+        self.jobs[name] = Job(name, func, interval, **options)
+
+    def start(self, max_workers=2):
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scheduler')
+        self.thread = threading.Thread(target=self.loop, name='scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self, wait=True):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+    def loop(self):
+        while not self.stopping.is_set():
+            self.submit_due()
+            self.stopping.wait(self.tick)
+
+    def submit_due(self):
+        now = time.time()
+        with self.mutex:
+            for job in self.jobs.values():
+                if job.running or job.next_run > now:
+                    continue
+                job.running = True
+                job.next_run = job.schedule_next(now)
+                self.executor.submit(self.run_job, job)
+
+    def run_job(self, job):
+        # 也可以在调度线程之外直接调用，例如命令行中立即执行某个任务
+        try:
+            started = time.time()
+            if self.lock is not None and not self.lock.acquire(job.name, started + job.timeout):
+                job.metrics['skipped'] += 1
+                self.record(job, {'skipped': True, 'failed': False, 'started': started, 'duration': 0.0, 'error': None})
+                return False
+            error = None
+            try:
+                job.func()
+            except Exception as exception:
+                error = repr(exception)
+                job.metrics['failures'] += 1
+                job.metrics['last_error'] = error
+                logger.exception('定时任务 %s 执行失败', job.name)
+            finally:
+                duration = time.time() - started
+                job.metrics['runs'] += 1
+                job.metrics['last_run'] = started
+                job.metrics['last_duration'] = duration
+                job.metrics['total_duration'] += duration
+                job.metrics['max_duration'] = max(job.metrics['max_duration'], duration)
+                if self.lock is not None:
+                    self.lock.release(job.name, started + job.interval * (1 - job.jitter))
+            self.record(job, {'skipped': False, 'failed': error is not None, 'started': started,
+                              'duration': duration, 'error': error})
+            return True
+        finally:
+            job.running = False
+
+    def record(self, job, outcome):
+        if self.recorder is None:
+            return
+        try:
+            self.recorder(job.name, outcome)
+        except Exception:
+            logger.exception('保存定时任务 %s 的执行情况失败', job.name)
+
+    def metrics(self):
+        return {name: dict(job.metrics, interval=job.interval, next_run=job.next_run, running=job.running)
+                for name, job in self.jobs.items()}
+
+class TaskQueue:
+    def __init__(self, max_workers=1):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='task')
+        self.active = set()
+        self.mutex = threading.Lock()
+
+    def submit(self, key, func):
+        # 同一 key 的任务尚未结束时不重复提交，返回是否提交了新任务
+        with self.mutex:
+            if key in self.active:
+                return False
+            self.active.add(key)
+        self.executor.submit(self.run, key, func)
+        return True
+
+    def run(self, key, func):
+        try:
+            func()
+        except Exception:
+            logger.exception('后台任务 %s 执行失败', key)
+        finally:
+            with self.mutex:
+                self.active.discard(key)
@@ -0,0 +1,145 @@
+# 纯 Python 实现的 n-gram 倒排索引，供不能使用 FTS5 的部署作为图书检索引擎
+# 每个字段各自维护 "字符片段 -> 图书 id" 的倒排表，倒排表用有序的 array 存储，
+# 查询时对各片段的倒排表求交集得到候选，再用子串匹配校验，语义与 LIKE '%q%' 一致
+from array import array
+from bisect import bisect_left
+
+FIELDS = ('title', 'author', 'category')
+
+def ngrams(value, n=2):
+    # 同时收录单字和 n 字片段，单字查询也能命中
+    value = (value or '').lower()
+    grams = set(value)
+    grams.update(value[i:i + n] for i in range(len(value) - n + 1))
+    return grams
+
+def query_grams(value, n=2):
+    # 查询只需要覆盖全部字符的最少片段：长度不足 n 时用单字，否则用 n 字片段
+    if len(value) < n:
+        return set(value)
+    return {value[i:i + n] for i in range(len(value) - n + 1)}
+
+def intersect(postings):
+    # 从最短的倒排表开始，逐个在其余倒排表中二分查找
+    postings = sorted(postings, key=len)
+    result = list(postings[0]) if postings else []
+    for posting in postings[1:]:
+        if not result:
+            break
+        size = len(posting)
+        kept = []
+        for doc_id in result:
+            i = bisect_left(posting, doc_id)
+            if i < size and posting[i] == doc_id:
+                kept.append(doc_id)
+        result = kept
+    return result
+
+def insert_sorted(posting, doc_id):
+    # 新书 id 通常递增，绝大多数情况直接追加
+    if not posting or posting[-1] < doc_id:
+        posting.append(doc_id)
+        return
+    i = bisect_left(posting, doc_id)
+    if i == len(posting) or posting[i] != doc_id:
+        posting.insert(i, doc_id)
+
+def remove_sorted(posting, doc_id):
+    i = bisect_left(posting, doc_id)
+    if i < len(posting) and posting[i] == doc_id:
+        del posting[i]
+
+class NgramIndex:
+    def __init__(self, n=2):
+        self.n = n
+        self.postings = {field: {} for field in FIELDS}
+        # 保存已索引的文本，用于删除时定位片段以及查询时校验子串
+        self.documents = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def clear(self):
+        self.postings = {field: {} for field in FIELDS}
+        self.documents = {}
+
+    def replace(self, other):
+        # 用另一个已构建好的索引替换当前内容，重建期间查询仍使用旧索引
+        self.postings, self.documents = other.postings, other.documents
+
+    def add(self, doc_id, title, author, category):
+        if doc_id in self.documents:
+            self.remove(doc_id)
+        values = tuple((value or '').lower() for value in (title, author, category))
+        self.documents[doc_id] = values
+        for field, value in zip(FIELDS, values):
+            postings = self.postings[field]
+            for gram in ngrams(value, self.n):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('q')
+                insert_sorted(posting, doc_id)
+
+    def update(self, doc_id, title, author, category):
+        values = tuple((value or '').lower() for value in (title, author, category))
+        if self.documents.get(doc_id) != values:
+            self.add(doc_id, title, author, category)
+
+    def remove(self, doc_id):
+        values = self.documents.pop(doc_id, None)
+        if values is None:
+            return
+        for field, value in zip(FIELDS, values):
+            postings = self.postings[field]
+            for gram in ngrams(value, self.n):
+                posting = postings.get(gram)
+                if posting is None:
+                    continue
+                remove_sorted(posting, doc_id)
+                if not posting:
+                    del postings[gram]
+
+    def candidates(self, field, value):
+        grams = query_grams(value, self.n)
+        postings = self.postings[field]
+        lists = []
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                return []
+            lists.append(posting)
+        return intersect(lists)
+
+    def search(self, query, category='', limit=None):
+        # 书名或作者包含 query，且类别包含 category；返回按 id 升序的图书 id
+        query = (query or '').lower()
+        category = (category or '').lower()
+        if query:
+            ids = set(self.candidates('title', query))
+            ids.update(self.candidates('author', query))
+            if category:
+                ids.intersection_update(self.candidates('category', category))
+        elif category:
+            ids = self.candidates('category', category)
+        else:
+            ids = self.documents
+        result = []
+        documents = self.documents
+        for doc_id in sorted(ids):
+            # 与 replace 并发时，候选 id 可能已不在新索引中
+            values = documents.get(doc_id)
+            if values is None:
+                continue
+            title, author, book_category = values
+            # 片段交集只是候选集，还要确认查询串确实是连续出现的子串
+            if query and query not in title and query not in author:
+                continue
+            if category and category not in book_category:
+                continue
+            result.append(doc_id)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
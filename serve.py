@@ -0,0 +1,225 @@
+# 生产环境启动入口
+# Flask 自带的开发服务器只有一个进程，每个请求新开一个线程，不适合部署。
+# 这里由主进程监听端口，预先导入应用并完成初始化（建表、模板预编译、n-gram 索引），
+# 然后 fork 出多个工作进程共享监听套接字和已初始化的内存状态；每个工作进程用固定大小的线程池处理请求。
+# 主进程只负责管理工作进程：意外退出的工作进程会被重新拉起，
+#   SIGHUP  平滑重启：先启动新一批工作进程，再让旧的处理完手上的请求后退出（未使用 --preload 时会重新加载代码）
+#   SIGTERM/SIGINT  平滑停止
+# 各工作进程的内存状态互不相通：n-gram 索引由本进程增量更新，其他进程修改图书后通过共享的版本号发现并在后台重建；
+# 登录校验结果缓存、密码哈希线程池、片段缓存内容、'memory' 会话存储、请求统计（/metrics 中的请求指标
+# 只来自响应的那个进程）都按进程各自一份；
+# 定时任务的执行情况与逾期扫描结果、缓存版本号和文档生成任务保存在数据库或 instance/ 中，所有进程看到的一致。
+# --scheduler 时定时任务在单独的进程中运行，不处理请求，只作用于本进程内存的任务（缓存预热）不在其中执行
+# 用法: python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8 --scheduler
+# 也可以使用 gunicorn: gunicorn -w 4 --threads 8 'app:create_app(preload=True)'
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler # type: ignore
+
+logger = logging.getLogger('serve')
+
+class RequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 空闲的长连接会一直占用线程池中的线程，超时后关闭
+    timeout = 5
+
+class PooledWSGIServer(BaseWSGIServer):
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def stop(self):
+        # 不再接受新连接，等待线程池中的请求处理完毕
+        self.shutdown()
+        self.pool.shutdown(wait=True)
+
+def load_app(preload):
+    import app as library
+    application = library.create_app(preload=preload)
+    if preload:
+        # 在主进程中预先构建，工作进程 fork 后直接共享
+        if application.config['SEARCH_ENGINE'] == 'ngram':
+            with application.app_context():
+                library.ensure_book_index()
+        # 连接不能跨进程共享，fork 之前关闭连接池中的连接
+        with application.app_context():
+            for engine in library.db.engines.values():
+                engine.dispose()
+    return library
+
+def run_worker(listener, args, library):
+    library = library or load_app(preload=False)
+    with library.app.app_context():
+        for engine in library.db.engines.values():
+            # 丢弃可能从主进程继承的连接，但不关闭它们
+            engine.dispose(close=False)
+    host, port = listener.getsockname()[:2]
+    server = PooledWSGIServer(host, port, library.app, args.threads, fd=listener.fileno())
+
+    def stop(signum, frame):
+        # shutdown 会等待 serve_forever 所在的线程退出循环，不能在该线程中直接调用
+        threading.Thread(target=server.stop).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    server.serve_forever()
+    server.pool.shutdown(wait=True)
+
+def run_scheduler(library):
+    library = library or load_app(preload=False)
+    library.start_scheduler(serves_requests=False)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    stopping.wait()
+    library.job_scheduler.stop()
+
+class Arbiter:
+    def __init__(self, listener, args, library):
+        self.listener = listener
+        self.args = args
+        self.library = library
+        self.workers = {}
+        self.signals = []
+        self.stopping = False
+
+    def spawn(self, kind):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = kind
+            return pid
+        # 子进程
+        code = 0
+        try:
+            if kind == 'scheduler':
+                run_scheduler(self.library)
+            else:
+                run_worker(self.listener, self.args, self.library)
+        except Exception:
+            logger.exception('工作进程异常退出')
+            code = 1
+        finally:
+            os._exit(code)
+
+    def spawn_all(self):
+        for _ in range(self.args.workers):
+            self.spawn('web')
+        if self.args.scheduler:
+            self.spawn('scheduler')
+
+    def terminate(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + self.args.graceful_timeout
+        while any(pid in self.workers for pid in pids) and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in pids:
+            if pid in self.workers:
+                logger.warning('工作进程 %d 未在 %.0f 秒内退出，强制结束', pid, self.args.graceful_timeout)
+                os.kill(pid, signal.SIGKILL)
+
+    def reap(self):
+        # 返回意外退出的工作进程类型
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            kind = self.workers.pop(pid, None)
+            if kind is not None:
+                exited.append((pid, kind, status))
+        return exited
+
+    def reload(self):
+        old = list(self.workers)
+        logger.info('平滑重启 %d 个工作进程', len(old))
+        self.spawn_all()
+        self.terminate(old)
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        self.spawn_all()
+        logger.info('监听 %s:%d，%d 个工作进程，每个 %d 个线程', *self.listener.getsockname()[:2],
+                    self.args.workers, self.args.threads)
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    logger.info('正在停止')
+                    self.stopping = True
+                    self.terminate(list(self.workers))
+                    return
+            for pid, kind, status in self.reap():
+                logger.warning('工作进程 %d 退出（状态 %d），重新启动', pid, status)
+                self.spawn(kind)
+            time.sleep(0.2)
+
+def parse_bind(value):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程启动图书管理系统')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='监听地址，默认 127.0.0.1:8000')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8, help='每个工作进程的线程数')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='不在主进程中预先加载应用，各工作进程自行导入，平滑重启时会加载新代码')
+    parser.add_argument('--scheduler', action='store_true', help='另起一个进程运行定时任务')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(message)s')
+    if not args.access_log:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    host, port = parse_bind(args.bind)
+    listener = socket.create_server((host, port), backlog=2048)
+    library = load_app(preload=True) if args.preload else None
+
+    if not hasattr(os, 'fork'):
+        # Windows 没有 fork，退化为单进程多线程
+        library = library or load_app(preload=False)
+        if args.scheduler:
+            library.start_scheduler()
+        server = PooledWSGIServer(host, port, library.app, args.threads, fd=listener.fileno())
+        logger.info('监听 %s:%d，单进程 %d 个线程', host, port, args.threads)
+        server.serve_forever()
+        return
+    Arbiter(listener, args, library).run()
+
+if __name__ == '__main__':
+    sys.exit(main())
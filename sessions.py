@@ -0,0 +1,229 @@
+# 服务端会话
+# Cookie 中只保存随机生成的会话编号，会话数据保存在服务端：
+#   MemorySessionStore  进程内 LRU，按过期时间淘汰，适合单进程部署
+#   SQLiteSessionStore  本地 SQLite 文件，同一台机器上的多个进程（serve.py 的工作进程）共享
+#   RedisSessionStore   多台服务器共享，需安装 redis 包
+# 会话中另外缓存当前用户的身份（id、用户名、角色），请求中不必再查询 user 表。
+# 用户的角色或密码修改后调用 store.clear_identity(用户 id)，该用户所有会话的身份缓存失效，下一次请求重新读取
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin # type: ignore
+from werkzeug.datastructures import CallbackDict # type: ignore
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, identity=None, expires=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.identity = identity
+        self.identity_modified = False
+        self.expires = expires
+        # 登录用户变化时更换会话编号，防止会话固定攻击
+        self.loaded_user_id = self.get('user_id')
+
+    def set_identity(self, identity):
+        self.identity = identity
+        self.identity_modified = True
+
+class MemorySessionStore:
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        # 会话编号 -> [数据, 身份, 用户 id, 过期时间]
+        self.entries = OrderedDict()
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def load(self, sid):
+        with self.lock:
+            entry = self.entries.get(sid)
+            if entry is None:
+                return None
+            if entry[3] < time.time():
+                self.remove(sid)
+                return None
+            self.entries.move_to_end(sid)
+            return dict(entry[0]), entry[1], entry[3]
+
+    def save(self, sid, data, identity, user_id, expires):
+        with self.lock:
+            self.remove(sid)
+            self.entries[sid] = [data, identity, user_id, expires]
+            if user_id is not None:
+                self.users.setdefault(user_id, set()).add(sid)
+            while len(self.entries) > self.max_entries:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, sid):
+        entry = self.entries.pop(sid, None)
+        if entry is not None and entry[2] is not None:
+            sids = self.users.get(entry[2])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self.users[entry[2]]
+
+    def delete(self, sid):
+        with self.lock:
+            self.remove(sid)
+
+    def clear_identity(self, user_id):
+        with self.lock:
+            for sid in self.users.get(user_id, ()):
+                self.entries[sid][1] = None
+
+    def purge(self):
+        now = time.time()
+        with self.lock:
+            for sid in [sid for sid, entry in self.entries.items() if entry[3] < now]:
+                self.remove(sid)
+
+class SQLiteSessionStore:
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, identity TEXT, '
+        'user_id INTEGER, expires REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS ix_sessions_user_id ON sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions (expires)',
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def connection(self):
+        # 每个线程一个连接；fork 出的子进程不能沿用父进程的连接
+        if getattr(self.local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def load(self, sid):
+        row = self.connection().execute('SELECT data, identity, expires FROM sessions WHERE sid = ? AND expires > ?',
+                                        (sid, time.time())).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1]) if row[1] else None, row[2]
+
+    def save(self, sid, data, identity, user_id, expires):
+        self.connection().execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, identity, user_id, expires) VALUES (?, ?, ?, ?, ?)',
+            (sid, json.dumps(data), json.dumps(identity) if identity else None, user_id, expires))
+
+    def delete(self, sid):
+        self.connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def clear_identity(self, user_id):
+        self.connection().execute('UPDATE sessions SET identity = NULL WHERE user_id = ?', (user_id,))
+
+    def purge(self):
+        self.connection().execute('DELETE FROM sessions WHERE expires < ?', (time.time(),))
+
+class RedisSessionStore:
+    # 会话保存为哈希 session:<编号>，由 Redis 按过期时间删除；session_user:<用户 id> 记录该用户的会话编号
+    def __init__(self, url):
+        import redis # type: ignore
+        self.redis = redis.Redis.from_url(url)
+
+    def load(self, sid):
+        values = self.redis.hmget(f'session:{sid}', 'data', 'identity', 'expires')
+        if values[0] is None:
+            return None
+        return json.loads(values[0]), json.loads(values[1]) if values[1] else None, float(values[2])
+
+    def save(self, sid, data, identity, user_id, expires):
+        key = f'session:{sid}'
+        pipeline = self.redis.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping={'data': json.dumps(data), 'identity': json.dumps(identity) if identity else '',
+                                    'expires': expires})
+        pipeline.expireat(key, int(expires) + 1)
+        if user_id is not None:
+            pipeline.sadd(f'session_user:{user_id}', sid)
+            pipeline.expireat(f'session_user:{user_id}', int(expires) + 1)
+        pipeline.execute()
+
+    def delete(self, sid):
+        self.redis.delete(f'session:{sid}')
+
+    def clear_identity(self, user_id):
+        for sid in self.redis.smembers(f'session_user:{user_id}'):
+            self.redis.hset(f'session:{sid.decode()}', 'identity', '')
+
+    def purge(self):
+        pass
+
+def make_session_store(config, instance_path):
+    backend = config['SESSION_BACKEND']
+    if backend == 'memory':
+        return MemorySessionStore(config['SESSION_MEMORY_MAX_ENTRIES'])
+    if backend == 'sqlite':
+        path = config['SESSION_SQLITE_PATH'] or os.path.join(instance_path, 'sessions.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteSessionStore(path)
+    if backend == 'redis':
+        return RedisSessionStore(config['SESSION_REDIS_URL'])
+    raise ValueError(f'未知的会话存储：{backend}')
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, make_store):
+        # 存储在第一次使用时创建，导入应用时不打开文件或网络连接
+        self.make_store = make_store
+        self.store_instance = None
+        self.lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self.store_instance is None:
+            with self.lock:
+                if self.store_instance is None:
+                    self.store_instance = self.make_store()
+        return self.store_instance
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            loaded = self.store.load(sid)
+            if loaded is not None:
+                data, identity, expires = loaded
+                return ServerSession(data, sid, identity, expires)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # 未修改的会话在过期时间过半后才续期，避免每个请求都写一次存储
+        renew = session.expires is None or session.expires - now < lifetime / 2
+        rotate = session.get('user_id') != session.loaded_user_id
+        if not (session.modified or session.identity_modified or renew or rotate or session.new):
+            return
+        if rotate and session.sid is not None:
+            self.store.delete(session.sid)
+        if session.sid is None or rotate:
+            session.sid = secrets.token_urlsafe(32)
+        expires = now + lifetime
+        self.store.save(session.sid, dict(session), session.identity, session.get('user_id'), expires)
+        response.set_cookie(name, session.sid, expires=expires if session.permanent else None,
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
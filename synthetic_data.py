@@ -0,0 +1,117 @@
+# 合成测试数据
+# 按随机种子确定性地生成图书、读者和借阅记录，整块向量化生成，供性能测试写入大规模数据：
+#   图书  中文与英文书名、作者，作者按编号固定姓名（一位作者有多本书），有效的 ISBN-13（979 前缀，不与真实图书重复）
+#   借阅  借出和归还都在开馆时段（9:00-21:00，午后较多），借出日期均匀分布在时间范围内，图书按 Zipf 分布的热度选取，
+#         读者的活跃程度同样服从 Zipf 分布；借期 LOAN_DAYS 天，借阅时长服从对数正态分布，
+#         约六分之一逾期归还，少数遗失一直未还，借阅时长超过当前时间的仍在借（其中超过借期的即为逾期）
+# 时间均为 Unix 时间戳（秒），未归还记录的归还时间为 -1
+import numpy as np # type: ignore
+
+SECONDS_PER_DAY = 86400
+LOAN_DAYS = 14
+# 借阅时长的中位数（天）与对数标准差
+LOAN_MEDIAN_DAYS = 9.0
+LOAN_SIGMA = 0.45
+# 遗失（一直未还）的比例
+LOST_RATE = 0.01
+# 图书热度与读者活跃度的 Zipf 指数，越大越集中在少数图书和读者上
+BOOK_ZIPF_EXPONENT = 0.8
+READER_ZIPF_EXPONENT = 0.6
+# 中文图书所占比例
+CHINESE_RATE = 0.6
+
+CATEGORIES = np.array(['文学', '小说', '历史', '科幻', '编程', '计算机科学', '经济', '管理', '哲学', '心理学',
+                       '艺术', '儿童', '医学', '教育', '旅行'], dtype=object)
+CATEGORY_WEIGHTS = np.array([14, 16, 9, 6, 8, 6, 7, 5, 4, 5, 4, 8, 3, 3, 2], dtype=np.float64)
+
+CN_ADJECTIVES = ['寂静的', '遥远的', '失落的', '燃烧的', '温柔的', '沉默的', '永恒的', '破碎的', '最后的', '漫长的',
+                 '看不见的', '流动的', '古老的', '自由的', '孤独的', '明亮的']
+CN_NOUNS = ['河流', '城市', '星空', '山谷', '时间', '花园', '记忆', '海洋', '王朝', '算法', '宇宙', '故乡',
+            '森林', '灯塔', '远方', '岁月', '文明', '市场', '心灵', '数据', '长夜', '春天', '边城', '群山']
+CN_TEMPLATES = ['{a}{n}', '{n}与{m}', '{n}简史', '{a}{n}：{m}的故事', '走进{n}', '{n}的{m}', '{n}三部曲',
+                '深入理解{n}', '{n}之书', '{a}{m}']
+CN_SURNAMES = list('王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁')
+CN_GIVEN = list('伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红鹏辉建文斌宇浩凯健俊帆帅旭宁晨阳雪琳晶欣')
+
+EN_ADJECTIVES = ['Silent', 'Distant', 'Lost', 'Burning', 'Gentle', 'Hidden', 'Eternal', 'Broken', 'Last',
+                 'Long', 'Invisible', 'Ancient', 'Free', 'Lonely', 'Bright', 'Quiet']
+EN_NOUNS = ['River', 'City', 'Stars', 'Valley', 'Time', 'Garden', 'Memory', 'Ocean', 'Empire', 'Algorithms',
+            'Universe', 'Home', 'Forest', 'Lighthouse', 'Horizon', 'Years', 'Civilization', 'Markets', 'Mind',
+            'Data', 'Night', 'Spring', 'Border', 'Mountains']
+EN_TEMPLATES = ['The {a} {n}', '{n} and {m}', 'A Brief History of {n}', 'The {a} {n}: A Story of {m}',
+                'Into the {n}', 'The {n} of {m}', 'The {n} Trilogy', 'Understanding {n}', 'The Book of {n}',
+                '{a} {m}']
+EN_FIRST = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+            'David', 'Susan', 'Richard', 'Jessica', 'Joseph', 'Sarah', 'Thomas', 'Karen', 'Daniel', 'Emily']
+EN_LAST = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Anderson',
+           'Taylor', 'Thomas', 'Moore', 'Martin', 'Jackson', 'Thompson', 'White', 'Harris', 'Clark', 'Lewis']
+
+def isbn13(numbers):
+    # 9 位编号加上 979 前缀和校验位；编号先做一次乘法置换，相邻图书的 ISBN 不连续
+    body = (np.asarray(numbers, dtype=np.int64) * 7919 + 104729) % 1000000000 + 979000000000
+    digits = body[:, None] // 10 ** np.arange(11, -1, -1, dtype=np.int64) % 10
+    check = (10 - (digits * np.tile([1, 3], 6)).sum(axis=1) % 10) % 10
+    return [str(value) for value in (body * 10 + check).tolist()]
+
+def author_names(author_ids, chinese):
+    # 作者编号决定姓名，同一编号的作者在不同图书上姓名相同
+    mixed = (np.asarray(author_ids, dtype=np.int64) * 2654435761) % 4294967296
+    names = []
+    for value, is_chinese in zip(mixed.tolist(), chinese.tolist()):
+        if is_chinese:
+            given = CN_GIVEN[value // 64 % len(CN_GIVEN)]
+            if value & 1:
+                given += CN_GIVEN[value // 4096 % len(CN_GIVEN)]
+            names.append(CN_SURNAMES[value % len(CN_SURNAMES)] + given)
+        else:
+            names.append(f'{EN_FIRST[value % len(EN_FIRST)]} {EN_LAST[value // 64 % len(EN_LAST)]}')
+    return names
+
+def book_columns(rng, start, count):
+    # 第 start 到 start + count - 1 本图书，返回 (书名, 作者, 类别, ISBN, 库存) 五列
+    chinese = rng.random(count) < CHINESE_RATE
+    template = rng.integers(0, len(CN_TEMPLATES), count).tolist()
+    adjective = rng.integers(0, len(CN_ADJECTIVES), count).tolist()
+    noun = rng.integers(0, len(CN_NOUNS), (2, count)).tolist()
+    titles = []
+    for i, is_chinese in enumerate(chinese.tolist()):
+        if is_chinese:
+            title = CN_TEMPLATES[template[i]].format(a=CN_ADJECTIVES[adjective[i]], n=CN_NOUNS[noun[0][i]],
+                                                     m=CN_NOUNS[noun[1][i]])
+        else:
+            title = EN_TEMPLATES[template[i]].format(a=EN_ADJECTIVES[adjective[i]], n=EN_NOUNS[noun[0][i]],
+                                                     m=EN_NOUNS[noun[1][i]])
+        titles.append(title)
+    # 平均每位作者约 4 本书
+    authors = author_names(rng.integers(0, max((start + count) // 4, 1), count), chinese)
+    categories = CATEGORIES[rng.choice(len(CATEGORIES), count, p=CATEGORY_WEIGHTS / CATEGORY_WEIGHTS.sum())].tolist()
+    isbns = isbn13(np.arange(start, start + count))
+    stock = (rng.geometric(0.35, count)).tolist()
+    return titles, authors, categories, isbns, stock
+
+def zipf_cdf(count, exponent):
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def zipf_choice(rng, ids, cdf, size):
+    # ids 按热度从高到低排列
+    return ids[np.minimum(np.searchsorted(cdf, rng.random(size)), len(ids) - 1)]
+
+def opening_hours(rng, count):
+    # 一天中的时刻（秒）落在开馆时段 9:00-21:00 内，三角分布的峰值在 15 点
+    return rng.triangular(9 * 3600, 15 * 3600, 21 * 3600, count).astype(np.int64)
+
+def loan_columns(rng, count, start_time, end_time, book_ids, book_cdf, user_ids, user_cdf, now):
+    # 借出日期在 [start_time, end_time) 内均匀分布，按借出时间排序；返回 (读者, 图书, 借出, 到期, 归还) 五列
+    days = rng.integers(start_time, max(end_time, start_time + 1), count, dtype=np.int64) // SECONDS_PER_DAY
+    borrowed = np.sort(np.minimum(days * SECONDS_PER_DAY + opening_hours(rng, count), now - 1))
+    due = borrowed + LOAN_DAYS * SECONDS_PER_DAY
+    # 归还同样发生在开馆时段内，当天借当天还的至少间隔十分钟
+    duration = rng.lognormal(np.log(LOAN_MEDIAN_DAYS * SECONDS_PER_DAY), LOAN_SIGMA, count).astype(np.int64)
+    returned = (borrowed + duration) // SECONDS_PER_DAY * SECONDS_PER_DAY + opening_hours(rng, count)
+    returned = np.maximum(returned, borrowed + 600)
+    returned[(returned > now) | (rng.random(count) < LOST_RATE)] = -1
+    users = zipf_choice(rng, user_ids, user_cdf, count)
+    books = zipf_choice(rng, book_ids, book_cdf, count)
+    return users, books, borrowed, due, returned
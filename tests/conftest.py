@@ -0,0 +1,25 @@
+# 测试在临时目录中的 SQLite 数据库上运行，数据库连接 URL 必须在导入 app 之前设置
+import os
+import sys
+import tempfile
+
+import pytest # type: ignore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='library-test-'), 'test.db')
+
+import app as library # noqa: E402
+
+@pytest.fixture(scope='session')
+def app_module():
+    # 会话保存在进程内，降低密码哈希强度，测试不必等待 scrypt
+    library.app.config.update(TESTING=True, SESSION_BACKEND='memory', PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    library.initialize()
+    return library
+
+@pytest.fixture
+def admin_client(app_module):
+    client = app_module.app.test_client()
+    client.post('/login?role=admin', data={'username': 'admin', 'password': 'admin'})
+    return client
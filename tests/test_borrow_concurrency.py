@@ -0,0 +1,60 @@
+# 并发借阅同一本书：库存检查与扣减在一条条件 UPDATE 中完成，不会超卖
+import threading
+import time
+
+THREADS = 16
+
+def add_book(library, isbn, stock):
+    with library.app.app_context():
+        book = library.Book(title='并发测试', author='测试', category='测试', isbn=isbn, stock=stock)
+        library.db.session.add(book)
+        library.db.session.commit()
+        return book.id
+
+def book_state(library, book_id):
+    with library.app.app_context():
+        stock = library.db.session.get(library.Book, book_id).stock
+        loans = library.BorrowRecord.query.filter_by(book_id=book_id).count()
+        return stock, loans
+
+def borrow_concurrently(library, book_id, attempts):
+    # 每个线程一个已登录的客户端，同时开始借阅，返回耗时
+    clients = []
+    for _ in range(THREADS):
+        client = library.app.test_client()
+        client.post('/login?role=user', data={'username': 'user', 'password': 'user'})
+        clients.append(client)
+    barrier = threading.Barrier(THREADS + 1)
+    errors = []
+
+    def borrow(client):
+        barrier.wait()
+        for _ in range(attempts):
+            response = client.get(f'/borrow_book/{book_id}')
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=borrow, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    return time.perf_counter() - start
+
+def test_last_copy_is_borrowed_once(app_module):
+    book_id = add_book(app_module, 'CONCURRENT-LAST', 1)
+    borrow_concurrently(app_module, book_id, 1)
+    assert book_state(app_module, book_id) == (0, 1)
+
+def test_borrow_throughput_without_lost_updates(app_module):
+    attempts = 20
+    stock = THREADS * attempts // 2
+    book_id = add_book(app_module, 'CONCURRENT-MANY', stock)
+    seconds = borrow_concurrently(app_module, book_id, attempts)
+    # 一半的请求遇到无库存，成功的借阅数恰好等于原有库存
+    assert book_state(app_module, book_id) == (0, stock)
+    print(f'{THREADS} 个线程共 {THREADS * attempts} 次借阅请求，{stock} 次成功，'
+          f'{THREADS * attempts / seconds:.0f} 次/秒')
@@ -0,0 +1,82 @@
+# 借阅统计的汇总表在借还的事务中增量更新，经过各种借还途径（包括批量接口整体回滚）之后，
+# 必须与直接按 borrow_record 计数的结果一致
+import pytest # type: ignore
+from sqlalchemy import text # type: ignore
+
+OPEN_BY_CATEGORY_SQL = '''SELECT COALESCE(b.category, ''), COUNT(*) FROM borrow_record r
+                          LEFT JOIN book b ON b.id = r.book_id WHERE r.return_date IS NULL GROUP BY 1'''
+OVERDUE_BY_CATEGORY_SQL = '''SELECT COALESCE(b.category, ''), COUNT(*) FROM borrow_record r
+                             LEFT JOIN book b ON b.id = r.book_id
+                             WHERE r.return_date IS NULL AND date(r.due_date) < date('now') GROUP BY 1'''
+READER_SQL = '''SELECT user_id, COUNT(*), SUM(CASE WHEN return_date IS NULL THEN 1 ELSE 0 END)
+                FROM borrow_record GROUP BY user_id'''
+
+@pytest.fixture
+def reader_client(app_module):
+    client = app_module.app.test_client()
+    client.post('/login?role=user', data={'username': 'user', 'password': 'user'})
+    return client
+
+def add_book(library, isbn, category, stock):
+    with library.app.app_context():
+        book = library.Book(title='统计测试', author='测试', category=category, isbn=isbn, stock=stock)
+        library.db.session.add(book)
+        library.db.session.commit()
+        return book.id
+
+def open_record_ids(library, book_id):
+    with library.app.app_context():
+        return library.db.session.execute(
+            library.db.select(library.BorrowRecord.id)
+            .where(library.BorrowRecord.book_id == book_id, library.BorrowRecord.return_date.is_(None))
+            .order_by(library.BorrowRecord.id)).scalars().all()
+
+def report_overdue(library, admin_client, monkeypatch):
+    context = {}
+    render = library.render_template
+
+    def capture(name, **values):
+        context.update(values)
+        return render(name, **values)
+
+    monkeypatch.setattr(library, 'render_template', capture)
+    assert admin_client.get('/admin/report').status_code == 200
+    return dict(context['overdue_by_category']), context['open_loans']
+
+def test_counters_match_borrow_records(app_module, admin_client, reader_client, monkeypatch):
+    library = app_module
+    with library.app.app_context():
+        # 包含逾期未还记录的历史数据；写入后按全部借阅记录重建汇总表，之前其他测试直接写入的记录也计入
+        library.generate_data(books=40, users=5, records=400, days=90, seed=7)
+    first = add_book(library, 'STATS-1', '统计测试', 4)
+    second = add_book(library, 'STATS-2', None, 2)
+
+    assert reader_client.get(f'/borrow_book/{first}').status_code == 302
+    assert reader_client.get(f'/return_book/{open_record_ids(library, first)[0]}').status_code == 302
+    response = reader_client.post('/api/v1/loans/checkout', json={'book_ids': [first, first, second]})
+    assert response.json['borrowed'] == 3
+    record_ids = open_record_ids(library, first)
+    response = reader_client.post('/api/v1/loans/checkin', json={'record_ids': record_ids[:1]})
+    assert response.json['returned'] == 1
+    # 整体执行的批量操作有一项失败时全部回滚，汇总表的增量也一起回滚
+    response = reader_client.post('/api/v1/loans/checkout', json={'book_ids': [second, 0], 'atomic': True})
+    assert response.json['borrowed'] == 0
+    response = reader_client.post('/api/v1/loans/checkin',
+                                  json={'record_ids': record_ids[1:] + record_ids[:1], 'atomic': True})
+    assert response.json['returned'] == 0
+
+    with library.app.app_context():
+        execute = library.db.session.execute
+        open_by_category = dict(execute(text(OPEN_BY_CATEGORY_SQL)).all())
+        counters = {category: count for category, count in execute(text(
+            'SELECT category, open_loans FROM category_open_loans')).all() if count}
+        assert counters == open_by_category
+        readers = {user_id: (loans, open_loans) for user_id, loans, open_loans in execute(text(READER_SQL)).all()}
+        stats = {user_id: (loans, open_loans) for user_id, loans, open_loans in execute(text(
+            'SELECT user_id, loans, open_loans FROM reader_stats')).all() if loans}
+        assert stats == readers
+        active = execute(text("SELECT value FROM circulation_total WHERE name = 'active_borrowers'")).scalar()
+        assert active == sum(open_loans > 0 for _, open_loans in readers.values())
+        overdue = dict(execute(text(OVERDUE_BY_CATEGORY_SQL)).all())
+    assert overdue
+    assert report_overdue(library, admin_client, monkeypatch) == (overdue, sum(open_by_category.values()))
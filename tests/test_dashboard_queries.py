@@ -0,0 +1,45 @@
+# 仪表板每次渲染发出的 SQL 条数与数据量无关：关联对象一并 JOIN 读取，列表按键集分页
+from sqlalchemy import event # type: ignore
+
+def add_rows(library, count):
+    db = library.db
+    admin = library.User.query.filter_by(username='admin').one()
+    reader = library.User.query.filter_by(username='user').one()
+    start = library.Book.query.count()
+    books = [library.Book(title=f'测试图书{start + i}', author='测试', category='测试',
+                          isbn=f'T{start + i:012d}', stock=1) for i in range(count)]
+    db.session.add_all(books)
+    db.session.flush()
+    for i, book in enumerate(books):
+        db.session.add(library.BorrowRecord(user_id=(admin if i % 2 else reader).id, book_id=book.id))
+        db.session.add(library.Feedback(user_id=reader.id, content=f'测试反馈{i}'))
+    db.session.commit()
+
+def dashboard_queries(library, client):
+    # 片段缓存命中时不查询数据库，先清空缓存，统计完整渲染的查询数
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    library.fragment_cache.clear()
+    with library.app.app_context():
+        engine = library.db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get('/dashboard')
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+def test_dashboard_query_count_is_constant(app_module, admin_client):
+    with app_module.app.app_context():
+        add_rows(app_module, 10)
+    admin_client.get('/dashboard')
+    small = dashboard_queries(app_module, admin_client)
+    # 行数超过一页后再统计一次
+    with app_module.app.app_context():
+        add_rows(app_module, 3 * app_module.app.config['DASHBOARD_PAGE_SIZE'])
+    large = dashboard_queries(app_module, admin_client)
+    assert small == large
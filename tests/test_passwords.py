@@ -0,0 +1,25 @@
+# 密码哈希线程池在 fork 之后仍然可用：serve.py 的主进程初始化时可能已经计算过哈希
+import os
+
+import pytest # type: ignore
+
+from passwords import PasswordHasher
+
+CONFIG = {'LOGIN_CACHE_SIZE': 10, 'LOGIN_CACHE_TTL': 0, 'PASSWORD_HASH_WORKERS': 1, 'PASSWORD_HASH_TIMEOUT': 5,
+          'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'}
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要 fork')
+def test_hash_after_fork():
+    hasher = PasswordHasher(CONFIG)
+    stored = hasher.hash('secret')
+    pid = os.fork()
+    if pid == 0:
+        # 子进程中不能让异常回到 pytest，以退出码报告结果
+        try:
+            matched, _ = hasher.verify(stored, 'secret')
+            code = 0 if matched and hasher.hash('other') else 1
+        except BaseException:
+            code = 2
+        os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
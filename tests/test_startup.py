@@ -0,0 +1,23 @@
+# 导入 app 保持轻量：可选依赖和 PostgreSQL 方言在用到时才导入，数据库在第一个请求时才连接和建表。
+# 在新的解释器中用 python -X importtime 导入，检查导入了哪些模块
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+LAZY_MODULES = ('numpy', 'docx', 'pyarrow', 'sqlalchemy.dialects.postgresql')
+
+def imported_modules(env):
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True, cwd=ROOT, env=env).stderr
+    return {line.rsplit('|', 1)[1].strip() for line in stderr.splitlines()
+            if line.startswith('import time:') and 'self [us]' not in line}
+
+def test_import_is_lazy(tmp_path):
+    database = tmp_path / 'startup.db'
+    modules = imported_modules(dict(os.environ, DATABASE_URL=f'sqlite:///{database}'))
+    assert 'app' in modules
+    for name in LAZY_MODULES:
+        assert not [module for module in modules if module == name or module.startswith(name + '.')], name
+    assert not database.exists()